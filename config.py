@@ -3,17 +3,26 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
 
 from dotenv import load_dotenv
 
-load_dotenv()
+
+def _load_env_snapshot() -> Mapping[str, str]:
+    """Load .env once and freeze the resulting environment."""
+    load_dotenv()
+    return MappingProxyType(dict(os.environ))
+
+
+_ENV_SNAPSHOT = _load_env_snapshot()
 
 KALSHI_REST_BASE = "https://api.elections.kalshi.com/trade-api/v2"
 KALSHI_WS_URL = "wss://api.elections.kalshi.com/trade-api/ws/v2"
 ODDS_WS_URL = "wss://api.oddspapi.io/v4/ws"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ApiConfig:
     kalshi_rest_base: str
     kalshi_ws_url: str
@@ -26,23 +35,34 @@ API = ApiConfig(
     odds_ws_url=ODDS_WS_URL,
 )
 
-KALSHI_KEY_ID = os.getenv("KALSHI_KEY_ID", "")
-KALSHI_API_KEY = os.getenv("KALSHI_API_KEY", "")
-KALSHI_PRIVATE_KEY_B64 = os.getenv("KALSHI_PRIVATE_KEY_B64", "")
+KALSHI_KEY_ID = _ENV_SNAPSHOT.get("KALSHI_KEY_ID", "")
+KALSHI_API_KEY = _ENV_SNAPSHOT.get("KALSHI_API_KEY", "")
+KALSHI_PRIVATE_KEY_B64 = _ENV_SNAPSHOT.get("KALSHI_PRIVATE_KEY_B64", "")
 
-ODDS_API_KEY = os.getenv("ODDS_API_KEY", "")
+ODDS_API_KEY = _ENV_SNAPSHOT.get("ODDS_API_KEY", "")
 
-BANKROLL = float(os.getenv("BANKROLL", "1000"))
-EV_THRESHOLD = float(os.getenv("EV_THRESHOLD", "0.05"))
-KELLY_MULTIPLIER = float(os.getenv("KELLY_MULTIPLIER", "0.2"))
+BANKROLL = float(_ENV_SNAPSHOT.get("BANKROLL", "1000"))
+EV_THRESHOLD = float(_ENV_SNAPSHOT.get("EV_THRESHOLD", "0.05"))
+MIN_EDGE = EV_THRESHOLD  # legacy alias
+KELLY_MULTIPLIER = float(_ENV_SNAPSHOT.get("KELLY_MULTIPLIER", "0.2"))
+
+# Optional CPU core to pin the bot to (Linux only); unset leaves it unpinned.
+_EVENT_LOOP_CPU = _ENV_SNAPSHOT.get("EVENT_LOOP_CPU", "").strip()
+EVENT_LOOP_CPU = int(_EVENT_LOOP_CPU) if _EVENT_LOOP_CPU else None
 
 KALSHI_MARKETS_URL = f"{KALSHI_REST_BASE}/markets"
+# Pages of 200 markets loaded at startup; 0 loads every page.
+KALSHI_MARKETS_MAX_PAGES = int(_ENV_SNAPSHOT.get("KALSHI_MARKETS_MAX_PAGES", "25"))
 KALSHI_ORDER_URL = f"{KALSHI_REST_BASE}/portfolio/orders"
 
-SHARP_BOOKS = {
-    "draftkings",
-    "pinnacle",
-    "fanduel",
-    "betmgm",
-    "hardrockbet",
-}
+SHARP_BOOKS = frozenset(
+    book.lower()
+    for book in (
+        "draftkings",
+        "pinnacle",
+        "fanduel",
+        "betmgm",
+        "hardrockbet",
+    )
+)
+SHARP_BOOKS_BYTES = tuple(book.encode() for book in SHARP_BOOKS)
@@ -1,39 +1,85 @@
-"""Odds API websocket streaming into an asyncio queue."""
+"""Odds API websocket streaming into a shared buffer."""
 from __future__ import annotations
 
-import json
+import asyncio
+import re
+from collections import deque
 from typing import Any
 from urllib.parse import urlencode, urlparse, urlunparse, parse_qsl
 
 import aiohttp
+import orjson
 
-from config import API, ODDS_API_KEY, SHARP_BOOKS
+from config import API, ODDS_API_KEY, SHARP_BOOKS, SHARP_BOOKS_BYTES
 
 
-async def odds_ws_feed(
-    session: aiohttp.ClientSession, queue: "asyncio.Queue[dict[str, Any]]"
-) -> None:
+def _build_odds_ws_url() -> str:
+    """Append the Odds API key to the websocket URL if it isn't already set."""
     url = API.odds_ws_url
-    if ODDS_API_KEY and "apiKey=" not in url:
-        parsed = urlparse(url)
-        query = dict(parse_qsl(parsed.query))
-        query["apiKey"] = ODDS_API_KEY
-        url = urlunparse(
-            (
-                parsed.scheme,
-                parsed.netloc,
-                parsed.path,
-                parsed.params,
-                urlencode(query),
-                parsed.fragment,
-            )
+    api_key = ODDS_API_KEY.strip()
+    if not api_key or "apiKey=" in url:
+        return url
+    parsed = urlparse(url)
+    query = dict(parse_qsl(parsed.query))
+    query["apiKey"] = api_key
+    return urlunparse(
+        (
+            parsed.scheme,
+            parsed.netloc,
+            parsed.path,
+            parsed.params,
+            urlencode(query),
+            parsed.fragment,
         )
-    async with session.ws_connect(url, heartbeat=15) as ws:
+    )
+
+
+_ODDS_WS_URL = _build_odds_ws_url()
+# Case-insensitive so the prefilter never rejects a frame that the post-parse
+# ``book.lower() in sharp_books`` check would accept.
+_SHARP_BOOKS_RE = re.compile(
+    b"|".join(re.escape(book) for book in sorted(SHARP_BOOKS_BYTES)), re.IGNORECASE
+)
+_SHARP_BOOKS_TEXT_RE = re.compile(_SHARP_BOOKS_RE.pattern.decode(), re.IGNORECASE)
+
+
+async def odds_ws_feed(
+    session: aiohttp.ClientSession,
+    buffer: deque[dict[str, Any]],
+    ready: asyncio.Event,
+) -> None:
+    """Append sharp-book payloads to ``buffer`` and signal ``ready``.
+
+    ``buffer`` should be bounded (``maxlen``) so stale quotes fall off the front
+    when the consumer lags.
+    """
+    text, binary = aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY
+    error = aiohttp.WSMsgType.ERROR
+    loads = orjson.loads
+    sharp_books = SHARP_BOOKS
+    search_bytes = _SHARP_BOOKS_RE.search
+    search_text = _SHARP_BOOKS_TEXT_RE.search
+    append = buffer.append
+    notify = ready.set
+    async with session.ws_connect(_ODDS_WS_URL, heartbeat=15) as ws:
         async for msg in ws:
-            if msg.type == aiohttp.WSMsgType.TEXT:
-                payload = json.loads(msg.data)
-                book = payload.get("bookmaker") or payload.get("bookmaker_key") or ""
-                if str(book).lower() in SHARP_BOOKS:
-                    await queue.put(payload)
-            elif msg.type == aiohttp.WSMsgType.ERROR:
+            msg_type = msg.type
+            # orjson parses str and bytes alike, so scan each frame in the form
+            # aiohttp delivered it rather than re-encoding TEXT frames.
+            if msg_type == text:
+                data = msg.data
+                if search_text(data) is None:
+                    continue
+            elif msg_type == binary:
+                data = msg.data
+                if search_bytes(data) is None:
+                    continue
+            elif msg_type == error:
                 break
+            else:
+                continue
+            payload = loads(data)
+            book = payload.get("bookmaker") or payload.get("bookmaker_key")
+            if book and book.__class__ is str and book.lower() in sharp_books:
+                append(payload)
+                notify()
@@ -1,25 +1,53 @@
 """Kalshi websocket data feed handling and request signing."""
 from __future__ import annotations
 
+import asyncio
 import base64
-import json
+import contextlib
+import hashlib
 import time
-from typing import Any, AsyncIterator
+from typing import Any
 from urllib.parse import urlparse
 
 import aiohttp
+import orjson
+from cryptography.exceptions import UnsupportedAlgorithm
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
 
 from config import API, KALSHI_API_KEY, KALSHI_KEY_ID, KALSHI_ORDER_URL, KALSHI_PRIVATE_KEY_B64
 
 _PRIVATE_KEY = None
+_SHA256 = hashes.SHA256()
+_PREHASHED_SHA256 = Prehashed(_SHA256)
+_PADDING_PSS = padding.PSS(
+    mgf=padding.MGF1(_SHA256),
+    salt_length=padding.PSS.DIGEST_LENGTH,
+)
+_KALSHI_WS_PATH = urlparse(API.kalshi_ws_url).path
+_METHOD_PATH_CACHE: dict[tuple[str, str], bytes] = {
+    ("GET", _KALSHI_WS_PATH): b"GET" + _KALSHI_WS_PATH.encode()
+}
+_PATH_CACHE: dict[str, str] = {API.kalshi_ws_url: _KALSHI_WS_PATH}
+_SIG_CACHE: dict[tuple[str, str, str], str] = {}
+_HEADER_TEMPLATE = {
+    "Content-Type": "application/json",
+    "KALSHI-ACCESS-KEY": KALSHI_KEY_ID,
+}
 
 
 def _api_key_value() -> str:
     return KALSHI_API_KEY or KALSHI_KEY_ID
 
 
+def _path_of(url: str) -> str:
+    path = _PATH_CACHE.get(url)
+    if path is None:
+        path = _PATH_CACHE[url] = urlparse(url).path
+    return path
+
+
 def _load_private_key() -> Any:
     global _PRIVATE_KEY
     if _PRIVATE_KEY is None:
@@ -32,48 +60,76 @@ def _load_private_key() -> Any:
     return _PRIVATE_KEY
 
 
-def sign_request(message: str) -> str:
+# Warm the key at import so the first signature doesn't pay for PEM parsing.
+# A bad key (missing, malformed, encrypted, unsupported) is left to raise on
+# first use instead of breaking the import.
+with contextlib.suppress(RuntimeError, ValueError, TypeError, UnsupportedAlgorithm):
+    _load_private_key()
+
+
+def sign_request(message: bytes) -> str:
     """Sign a payload with RSA-2048 (PSS), returning base64."""
     private_key = _load_private_key()
-    signature = private_key.sign(
-        message.encode("utf-8"),
-        padding.PSS(
-            mgf=padding.MGF1(hashes.SHA256()),
-            salt_length=padding.PSS.DIGEST_LENGTH,
-        ),
-        hashes.SHA256(),
-    )
+    digest = hashlib.sha256(message).digest()
+    signature = private_key.sign(digest, _PADDING_PSS, _PREHASHED_SHA256)
     return base64.b64encode(signature).decode("utf-8")
 
 
-def build_ws_headers(ws_url: str, timestamp: str) -> dict[str, str]:
-    """Build websocket auth headers using Kalshi's access signature scheme."""
-    parsed = urlparse(ws_url)
-    message = f"{timestamp}GET{parsed.path}"
-    signature = sign_request(message)
+def build_headers(method: str, path: str, timestamp: str) -> dict[str, str]:
+    """Build Kalshi access-signature headers for a request."""
+    key = (method, path, timestamp)
+    signature = _SIG_CACHE.get(key)
+    if signature is None:
+        # A repeat (method, path, ms) can reuse the last signature; skip the modexp.
+        if len(_SIG_CACHE) > 64:
+            _SIG_CACHE.clear()
+        suffix = _METHOD_PATH_CACHE.get((method, path))
+        if suffix is None:
+            suffix = _METHOD_PATH_CACHE[(method, path)] = f"{method}{path}".encode()
+        signature = sign_request(timestamp.encode() + suffix)
+        _SIG_CACHE[key] = signature
     return {
-        "Content-Type": "application/json",
-        "KALSHI-ACCESS-KEY": KALSHI_KEY_ID,
+        **_HEADER_TEMPLATE,
         "KALSHI-ACCESS-TIMESTAMP": timestamp,
         "KALSHI-ACCESS-SIGNATURE": signature,
     }
 
 
+def build_ws_headers(ws_url: str, timestamp: str) -> dict[str, str]:
+    """Build websocket auth headers using Kalshi's access signature scheme."""
+    return build_headers("GET", _path_of(ws_url), timestamp)
+
+
 async def kalshi_ws_stream(
-    session: aiohttp.ClientSession,
-) -> AsyncIterator[dict[str, Any]]:
-    """Yield messages from the Kalshi websocket."""
+    session: aiohttp.ClientSession, queue: "asyncio.Queue[dict[str, Any]]"
+) -> None:
+    """Push messages from the Kalshi websocket into a queue."""
     if not KALSHI_KEY_ID:
         raise RuntimeError("Missing Key: set KALSHI_KEY_ID in your .env file")
-    timestamp = str(int(time.time() * 1000))
-    headers = build_ws_headers(API.kalshi_ws_url, timestamp)
+    timestamp = str(time.time_ns() // 1_000_000)
+    # RSA signing releases the GIL; keep the modexp off the event loop thread.
+    headers = await asyncio.to_thread(
+        build_ws_headers, API.kalshi_ws_url, timestamp
+    )
+    text, binary = aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY
+    error = aiohttp.WSMsgType.ERROR
+    loads = orjson.loads
+    put = queue.put_nowait
     async with session.ws_connect(
         API.kalshi_ws_url, headers=headers, heartbeat=15
     ) as ws:
         async for msg in ws:
-            if msg.type == aiohttp.WSMsgType.TEXT:
-                yield json.loads(msg.data)
-            elif msg.type == aiohttp.WSMsgType.ERROR:
+            msg_type = msg.type
+            if msg_type == text or msg_type == binary:
+                if queue.full():
+                    try:
+                        queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        pass
+                    else:
+                        queue.task_done()
+                put(loads(msg.data))
+            elif msg_type == error:
                 break
 
 
@@ -95,7 +151,9 @@ async def place_limit_order(
         "price": price,
         "count": quantity,
     }
-    headers = {"Authorization": f"Bearer {api_key}"}
-    async with session.post(KALSHI_ORDER_URL, json=payload, headers=headers) as resp:
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    async with session.post(
+        KALSHI_ORDER_URL, data=orjson.dumps(payload), headers=headers
+    ) as resp:
         resp.raise_for_status()
-        return await resp.json()
+        return await resp.json(loads=orjson.loads)
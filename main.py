@@ -3,7 +3,9 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import itertools
 import time
+from collections import deque
 from dataclasses import dataclass, field
 from email.utils import parsedate_to_datetime
 from typing import Any
@@ -16,25 +18,43 @@ from rich.live import Live
 from rich.panel import Panel
 from rich.table import Table
 
-from config import BANKROLL, EV_THRESHOLD, KELLY_MULTIPLIER
+from config import (
+    API,
+    BANKROLL,
+    EV_THRESHOLD,
+    EVENT_LOOP_CPU,
+    KALSHI_MARKETS_MAX_PAGES,
+    KELLY_MULTIPLIER,
+)
 from gather_data import odds_ws_feed
 from kalshi_data import kalshi_ws_stream, place_limit_order
-from mapping import MarketMapper
+from mapping import MarketEntry, MarketMapper
 from math_engine import devig_two_way, kelly_bet_size
 
 console = Console()
 
+ODDS_BUFFER_SIZE = 1024
+KALSHI_QUEUE_SIZE = 1024
+WARM_CONNECTIONS = 8
+KEEPALIVE_TIMEOUT = 75
+# Re-touch the warm sockets well inside the keepalive window so they are
+# still open when an order goes out.
+WARM_REFRESH_INTERVAL = 30
+
 
 @dataclass
 class BotState:
     bankroll: float = BANKROLL
-    signals: list[dict[str, Any]] = field(default_factory=list)
-    logs: list[str] = field(default_factory=list)
+    signals: deque[dict[str, Any]] = field(
+        default_factory=lambda: deque(maxlen=1024)
+    )
+    logs: deque[str] = field(default_factory=lambda: deque(maxlen=10))
     kalshi_prices: dict[str, int] = field(default_factory=dict)
+    version: int = 0
 
     def log(self, message: str) -> None:
         self.logs.append(message)
-        self.logs[:] = self.logs[-10:]
+        self.version += 1
 
 
 async def check_time_sync(state: BotState, session: aiohttp.ClientSession) -> None:
@@ -61,6 +81,39 @@ async def check_time_sync(state: BotState, session: aiohttp.ClientSession) -> No
         state.log(f"Time check failed: {exc}")
 
 
+async def warm_kalshi_connections(
+    state: BotState, session: aiohttp.ClientSession, *, quiet: bool = False
+) -> bool:
+    """Open keepalive sockets to Kalshi so the first order skips the TLS handshake.
+
+    Returns False if any request failed; ``quiet`` suppresses the log entry.
+    """
+    url = f"{API.kalshi_rest_base}/exchange/status"
+
+    async def _touch() -> None:
+        async with session.get(url, timeout=10) as resp:
+            await resp.read()
+
+    results = await asyncio.gather(
+        *(_touch() for _ in range(WARM_CONNECTIONS)), return_exceptions=True
+    )
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures and not quiet:
+        state.log(f"Connection warmup failed: {failures[0]}")
+    return not failures
+
+
+async def keep_kalshi_connections_warm(
+    state: BotState, session: aiohttp.ClientSession
+) -> None:
+    """Refresh the warm sockets before the connector's keepalive closes them."""
+    healthy = True
+    while True:
+        await asyncio.sleep(WARM_REFRESH_INTERVAL)
+        # Only log the first failure of a streak so the dashboard isn't flooded.
+        healthy = await warm_kalshi_connections(state, session, quiet=not healthy)
+
+
 def _attempt_time_sync(state: BotState) -> None:
     """Attempt to enable NTP sync (best-effort)."""
     import os
@@ -83,6 +136,23 @@ def _attempt_time_sync(state: BotState) -> None:
     state.log("Attempted to enable system time sync (NTP).")
 
 
+def _pin_event_loop_thread() -> None:
+    """Pin the process to EVENT_LOOP_CPU and try real-time scheduling (best-effort)."""
+    import os
+
+    if EVENT_LOOP_CPU is None or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        os.sched_setaffinity(0, {EVENT_LOOP_CPU})
+    except OSError as exc:
+        console.print(
+            f"[yellow]CPU pinning to core {EVENT_LOOP_CPU} failed: {exc}[/yellow]"
+        )
+        return
+    with contextlib.suppress(OSError):
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(1))
+
+
 def build_dashboard(state: BotState) -> Layout:
     layout = Layout()
     layout.split_column(
@@ -95,7 +165,8 @@ def build_dashboard(state: BotState) -> Layout:
     signals_table.add_column("Market")
     signals_table.add_column("Edge")
     signals_table.add_column("Bet")
-    for signal in state.signals[-5:]:
+    recent_signals = itertools.islice(state.signals, max(len(state.signals) - 5, 0), None)
+    for signal in recent_signals:
         signals_table.add_row(
             signal.get("market", "-"),
             f"{signal.get('edge', 0):.2%}",
@@ -110,7 +181,7 @@ def build_dashboard(state: BotState) -> Layout:
 
     logs_table = Table(title="Sniper Log", box=box.SIMPLE)
     logs_table.add_column("Message")
-    for line in state.logs[-10:]:
+    for line in state.logs:
         logs_table.add_row(line)
 
     layout["signals"].update(signals_table)
@@ -119,83 +190,142 @@ def build_dashboard(state: BotState) -> Layout:
     return layout
 
 
-async def process_kalshi_feed(state: BotState) -> None:
-    async for message in kalshi_ws_stream(state.session):  # type: ignore[attr-defined]
+async def process_kalshi_feed(
+    state: BotState, queue: asyncio.Queue[dict[str, Any]]
+) -> None:
+    while True:
+        message = await queue.get()
         if message.get("type") == "price":
             ticker = message.get("ticker")
             price = message.get("price")
             if ticker and price is not None:
                 state.kalshi_prices[ticker] = int(price)
         state.log(f"Kalshi update: {message.get('type', 'unknown')}")
-        await asyncio.sleep(0)
+        queue.task_done()
+
+
+def _parse_odds_payload(payload: dict[str, Any]) -> tuple[str, int, int] | None:
+    """Return ``(team_a, odds_a, odds_b)`` or None for a malformed payload."""
+    team_a = payload.get("team_a")
+    odds_a = payload.get("odds_a")
+    odds_b = payload.get("odds_b")
+    if not (team_a.__class__ is str and team_a and payload.get("team_b")):
+        return None
+    if not (odds_a and odds_b):
+        return None
+    try:
+        return team_a, int(odds_a), int(odds_b)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+async def _handle_odds_payload(
+    state: BotState, team_a: str, odds_a: int, odds_b: int, market: MarketEntry | None
+) -> None:
+    fair_a, _ = devig_two_way(odds_a, odds_b)
+    if not market:
+        state.log(f"No Kalshi market for {team_a}")
+        return
+
+    kalshi_price = state.kalshi_prices.get(market.ticker)
+    if kalshi_price is None:
+        return
+
+    kalshi_prob = kalshi_price / 100
+    edge = fair_a - kalshi_prob
+    if edge >= EV_THRESHOLD:
+        payout = (1 - kalshi_prob) / kalshi_prob if kalshi_prob > 0 else 0
+        size = kelly_bet_size(state.bankroll, edge, payout, KELLY_MULTIPLIER)
+        if size > 0:
+            contracts = int(size)
+            await place_limit_order(
+                state.session, market.ticker, "buy", int(kalshi_price), contracts
+            )
+            state.bankroll -= contracts
+            state.signals.append({"market": market.ticker, "edge": edge, "size": size})
+            state.log(f"Sniped {market.ticker} @ {kalshi_price} for {contracts}")
 
 
 async def process_odds_feed(
-    state: BotState, mapper: MarketMapper, queue: asyncio.Queue[dict[str, Any]]
+    state: BotState,
+    mapper: MarketMapper,
+    buffer: deque[dict[str, Any]],
+    ready: asyncio.Event,
 ) -> None:
     while True:
-        payload = await queue.get()
-        team_a = payload.get("team_a")
-        team_b = payload.get("team_b")
-        odds_a = payload.get("odds_a")
-        odds_b = payload.get("odds_b")
-        if not all([team_a, team_b, odds_a, odds_b]):
-            queue.task_done()
-            continue
-
-        fair_a, _ = devig_two_way(int(odds_a), int(odds_b))
-        market = mapper.find_market(team_a)
-        if not market:
-            state.log(f"No Kalshi market for {team_a}")
-            queue.task_done()
-            continue
-
-        kalshi_price = state.kalshi_prices.get(market.ticker)
-        if kalshi_price is None:
-            queue.task_done()
-            continue
-
-        kalshi_prob = kalshi_price / 100
-        edge = fair_a - kalshi_prob
-        if edge >= EV_THRESHOLD:
-            payout = (1 - kalshi_prob) / kalshi_prob if kalshi_prob > 0 else 0
-            size = kelly_bet_size(state.bankroll, edge, payout, KELLY_MULTIPLIER)
-            if size > 0:
-                contracts = int(size)
-                await place_limit_order(
-                    state.session, market.ticker, "buy", int(kalshi_price), contracts
+        await ready.wait()
+        ready.clear()
+        while buffer:
+            batch = list(buffer)
+            buffer.clear()
+            # Validate before matching so one malformed payload can't take the
+            # task down, and match each distinct team name only once.
+            parsed = [p for p in map(_parse_odds_payload, batch) if p is not None]
+            names = list(dict.fromkeys(team_a for team_a, _, _ in parsed))
+            markets = dict(zip(names, mapper.find_markets_bulk(names)))
+            for team_a, odds_a, odds_b in parsed:
+                await _handle_odds_payload(
+                    state, team_a, odds_a, odds_b, markets[team_a]
                 )
-                state.bankroll -= contracts
-                state.signals.append({"market": market.ticker, "edge": edge, "size": size})
-                state.log(f"Sniped {market.ticker} @ {kalshi_price} for {contracts}")
-
-        queue.task_done()
 
 
 async def dashboard_loop(state: BotState) -> None:
-    with Live(build_dashboard(state), console=console, refresh_per_second=4) as live:
+    last_version = state.version
+    with Live(build_dashboard(state), console=console, auto_refresh=False) as live:
         while True:
-            live.update(build_dashboard(state))
             await asyncio.sleep(0.25)
+            # Every dashboard-visible change is logged, so an unchanged version
+            # means there is nothing new to render.
+            if state.version != last_version:
+                last_version = state.version
+                live.update(build_dashboard(state), refresh=True)
 
 
 async def main() -> None:
     mapper = MarketMapper()
-    queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    odds_buffer: deque[dict[str, Any]] = deque(maxlen=ODDS_BUFFER_SIZE)
+    odds_ready = asyncio.Event()
+    kalshi_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(
+        maxsize=KALSHI_QUEUE_SIZE
+    )
     state = BotState()
 
-    connector = aiohttp.TCPConnector(limit=0, ttl_dns_cache=300)
-    async with aiohttp.ClientSession(connector=connector) as session:
+    connector = aiohttp.TCPConnector(
+        limit=0,
+        ttl_dns_cache=300,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        force_close=False,
+        enable_cleanup_closed=True,
+    )
+    # Keep aiohttp's default 5 minute total but fail fast on unreachable hosts.
+    timeout = aiohttp.ClientTimeout(total=5 * 60, connect=5)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
         state.session = session  # type: ignore[attr-defined]
         await check_time_sync(state, session)
-        await mapper.preload(session)
-        state.log("Loaded Kalshi markets into RAM")
+        await warm_kalshi_connections(state, session)
+        loaded = await mapper.preload(session)
+        if loaded.error is not None:
+            state.log(
+                f"Loaded {loaded.markets} Kalshi markets (PARTIAL: a later page "
+                f"failed: {loaded.error})"
+            )
+        elif loaded.truncated:
+            state.log(
+                f"Loaded {loaded.markets} Kalshi markets (TRUNCATED at "
+                f"KALSHI_MARKETS_MAX_PAGES={KALSHI_MARKETS_MAX_PAGES})"
+            )
+        else:
+            state.log(f"Loaded {loaded.markets} Kalshi markets into RAM")
 
         tasks = [
-            asyncio.create_task(odds_ws_feed(session, queue)),
-            asyncio.create_task(process_odds_feed(state, mapper, queue)),
+            asyncio.create_task(odds_ws_feed(session, odds_buffer, odds_ready)),
+            asyncio.create_task(
+                process_odds_feed(state, mapper, odds_buffer, odds_ready)
+            ),
             asyncio.create_task(dashboard_loop(state)),
-            asyncio.create_task(process_kalshi_feed(state)),
+            asyncio.create_task(kalshi_ws_stream(session, kalshi_queue)),
+            asyncio.create_task(process_kalshi_feed(state, kalshi_queue)),
+            asyncio.create_task(keep_kalshi_connections_warm(state, session)),
         ]
 
         try:
@@ -208,11 +338,8 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    try:
-        import uvloop
-
-        uvloop.install()
-    except ImportError:
-        pass
+    import uvloop
 
+    _pin_event_loop_thread()
+    uvloop.install()
     asyncio.run(main())
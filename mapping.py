@@ -2,71 +2,344 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import dataclass
-from typing import Iterable
+import contextlib
+import os
+import re
+import stat
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Sequence
 
 import aiohttp
+import numpy as np
 import orjson
-from rapidfuzz import process, fuzz
+from rapidfuzz import fuzz, process, utils
 
-from config import KALSHI_MARKETS_URL
+from config import KALSHI_MARKETS_MAX_PAGES, KALSHI_MARKETS_URL
 
+_TEAM_SPLIT_RE = re.compile(r"\s*(?:@|\bvs\b\.?)\s*", re.IGNORECASE)
+_LOOKUP_CACHE_SIZE = 4096
+_MARKETS_PAGE_LIMIT = 200
+_MARKETS_MAX_RETRIES = 4
+_MARKETS_RETRY_DELAY = 0.5
+# Per-user private directory: tickers read back from here go straight into
+# orders, so the cache must not live anywhere another user can write.
+_MARKETS_CACHE_DIR = Path.home() / ".cache" / "kalshi_sniper"
+_MARKETS_CACHE_PATH = _MARKETS_CACHE_DIR / "kalshi_markets.json"
+_MARKETS_CACHE_TTL = 5 * 60
+_MATCH_SCORE_CUTOFF = 70
+# Shared city prefixes carry token_set_ratio a long way: "kansas city chiefs"
+# scores 75.9 against "kansas city royals" and the Lakers 84.2 against the
+# Clippers. A missed market costs nothing; a wrong one places a bad order.
+_TOKEN_SET_SCORE_CUTOFF = 85
+# WRatio's partial/token passes only pay off for abbreviations and nicknames.
+_WRATIO_MAX_QUERY_LEN = 8
+# Below this many queries, starting cdist's thread pool costs more than it saves.
+_CDIST_PARALLEL_MIN = 64
+_MISSING = object()
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class MarketEntry:
     ticker: str
     title: str
     teams: tuple[str, ...]
 
 
+@dataclass(frozen=True, slots=True)
+class PreloadResult:
+    """What ``MarketMapper.preload`` ended up with."""
+
+    markets: int
+    truncated: bool = False  # stopped at KALSHI_MARKETS_MAX_PAGES
+    error: str | None = None  # a later page failed; earlier pages were kept
+
+
+@dataclass(frozen=True, slots=True)
+class _MarketIndex:
+    """Snapshot of loaded markets plus its own lookup caches.
+
+    The fields are never rebound and the market data is never changed after
+    ``build``, but the LRU caches are filled in by every lookup.
+    """
+
+    entries: tuple[MarketEntry, ...] = ()
+    teams: tuple[str, ...] = ()
+    teams_norm: tuple[str, ...] = ()
+    exact: dict[str, str] = field(default_factory=dict)
+    team_to_entry: dict[str, MarketEntry] = field(default_factory=dict)
+    match_cache: OrderedDict[str, str | None] = field(default_factory=OrderedDict)
+    market_cache: OrderedDict[str, MarketEntry | None] = field(
+        default_factory=OrderedDict
+    )
+
+    @classmethod
+    def build(cls, entries: list[MarketEntry]) -> _MarketIndex:
+        teams = tuple(team for entry in entries for team in entry.teams)
+        teams_norm = tuple(utils.default_process(team) for team in teams)
+        return cls(
+            entries=tuple(entries),
+            teams=teams,
+            teams_norm=teams_norm,
+            # Both maps are built from reversed input so the first team/market
+            # wins, matching extractOne's first-best pick and the old linear scan.
+            exact=dict(zip(reversed(teams_norm), reversed(teams))),
+            team_to_entry={
+                team: entry for entry in reversed(entries) for team in entry.teams
+            },
+        )
+
+
 class MarketMapper:
     def __init__(self) -> None:
-        self._entries: list[MarketEntry] = []
-        self._team_index: list[str] = []
+        # Readers grab ``self._index`` once and work on that snapshot; preload
+        # swaps in a new one with a single attribute assignment, so lookups
+        # never need the lock.
+        self._index = _MarketIndex()
+        self._preload_result = PreloadResult(markets=0)
         self._lock = asyncio.Lock()
 
-    async def preload(self, session: aiohttp.ClientSession) -> None:
+    async def preload(self, session: aiohttp.ClientSession) -> PreloadResult:
         """Load all active markets into memory once at startup."""
         async with self._lock:
-            if self._entries:
-                return
+            if self._index.entries:
+                return self._preload_result
+            cached = self._load_cached_entries()
+            if cached:
+                self._index = _MarketIndex.build(cached)
+                self._preload_result = PreloadResult(markets=len(cached))
+                return self._preload_result
             entries: list[MarketEntry] = []
             payload = None
             for status in ("active", "open"):
-                params = {"status": status, "limit": 200}
-                async with session.get(KALSHI_MARKETS_URL, params=params) as resp:
-                    if resp.status == 400 and status == "active":
-                        continue
-                    resp.raise_for_status()
-                    payload = orjson.loads(await resp.read())
+                payload = await self._fetch_markets_page(session, status)
+                if payload is not None:
                     break
             if payload is None:
                 raise RuntimeError("Failed to load Kalshi markets.")
-            for market in payload.get("markets", []):
-                title = market.get("title", "")
-                ticker = market.get("ticker", "")
-                teams = tuple(self._extract_teams(title))
-                entries.append(MarketEntry(ticker=ticker, title=title, teams=teams))
-            self._entries = entries
-            self._team_index = [team for entry in entries for team in entry.teams]
+            # Cursors are only known one page ahead, so pages can't be fetched in
+            # parallel; instead the next request is in flight while this page is
+            # turned into entries.
+            truncated = False
+            error: str | None = None
+            pages = 1
+            while True:
+                cursor = payload.get("cursor")
+                if cursor and 0 < KALSHI_MARKETS_MAX_PAGES <= pages:
+                    cursor = None
+                    truncated = True
+                next_page = (
+                    asyncio.create_task(
+                        self._fetch_markets_page(session, status, cursor)
+                    )
+                    if cursor
+                    else None
+                )
+                try:
+                    for market in payload.get("markets", []):
+                        title = market.get("title", "")
+                        ticker = market.get("ticker", "")
+                        teams = tuple(self._extract_teams(title))
+                        entries.append(
+                            MarketEntry(ticker=ticker, title=title, teams=teams)
+                        )
+                except BaseException:
+                    if next_page is not None:
+                        next_page.cancel()
+                    raise
+                if next_page is None:
+                    break
+                try:
+                    payload = await next_page
+                except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                    # Keep the pages already loaded rather than failing startup.
+                    error = repr(exc)
+                    break
+                pages += 1
+            self._index = _MarketIndex.build(entries)
+            if not truncated and error is None:
+                self._store_cached_entries(entries)
+            self._preload_result = PreloadResult(
+                markets=len(entries), truncated=truncated, error=error
+            )
+            return self._preload_result
+
+    @staticmethod
+    def _load_cached_entries() -> list[MarketEntry] | None:
+        """Return entries from the on-disk cache if it is fresh and ours."""
+        try:
+            st = _MARKETS_CACHE_PATH.lstat()
+            if not stat.S_ISREG(st.st_mode) or st.st_uid != os.getuid():
+                return None
+            if time.time() - st.st_mtime > _MARKETS_CACHE_TTL:
+                return None
+            rows = orjson.loads(_MARKETS_CACHE_PATH.read_bytes())
+            return [
+                MarketEntry(ticker=ticker, title=title, teams=tuple(teams))
+                for ticker, title, teams in rows
+            ]
+        except (OSError, ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def _store_cached_entries(entries: list[MarketEntry]) -> None:
+        """Best-effort write of the entries for the next cold start."""
+        rows = [[entry.ticker, entry.title, entry.teams] for entry in entries]
+        tmp_name = None
+        try:
+            _MARKETS_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=_MARKETS_CACHE_DIR, suffix=".tmp", delete=False
+            ) as tmp:
+                tmp_name = tmp.name
+                tmp.write(orjson.dumps(rows))
+            os.replace(tmp_name, _MARKETS_CACHE_PATH)
+        except OSError:
+            if tmp_name is not None:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_name)
+
+    async def _fetch_markets_page(
+        self, session: aiohttp.ClientSession, status: str, cursor: str | None = None
+    ) -> dict[str, Any] | None:
+        """Fetch one page of markets; None if the first "active" page is rejected.
+
+        429 responses are retried with exponential backoff, honouring a numeric
+        ``Retry-After`` header.
+        """
+        params: dict[str, Any] = {"status": status, "limit": _MARKETS_PAGE_LIMIT}
+        if cursor:
+            params["cursor"] = cursor
+        attempt = 0
+        while True:
+            async with session.get(KALSHI_MARKETS_URL, params=params) as resp:
+                if resp.status == 400 and status == "active" and cursor is None:
+                    return None
+                if resp.status != 429 or attempt >= _MARKETS_MAX_RETRIES:
+                    resp.raise_for_status()
+                    return orjson.loads(await resp.read())
+                retry_after = resp.headers.get("Retry-After", "")
+            delay = _MARKETS_RETRY_DELAY * 2**attempt
+            with contextlib.suppress(ValueError):
+                delay = max(delay, float(retry_after))
+            attempt += 1
+            await asyncio.sleep(delay)
 
     def _extract_teams(self, title: str) -> Iterable[str]:
-        parts = [part.strip() for part in title.replace("@", "vs").split("vs")]
-        return [part for part in parts if part]
+        return [part for part in _TEAM_SPLIT_RE.split(title.strip()) if part]
+
+    # All lookups run on the event loop today, so these never race. If the
+    # mapper were ever called from a thread pool, another reader could evict a
+    # key between two cache calls; KeyError is treated as that lost race.
+    @staticmethod
+    def _cache_get(cache: OrderedDict[str, Any], key: str) -> Any:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            with contextlib.suppress(KeyError):
+                cache.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(cache: OrderedDict[str, Any], key: str, value: Any) -> None:
+        cache[key] = value
+        if len(cache) > _LOOKUP_CACHE_SIZE:
+            with contextlib.suppress(KeyError):
+                cache.popitem(last=False)
 
     def match_team(self, name: str) -> str | None:
         """Return the closest team string from loaded markets."""
-        if not self._team_index:
+        return self._match_team(self._index, name)
+
+    def _match_team(self, index: _MarketIndex, name: str) -> str | None:
+        if not index.teams:
             return None
-        match = process.extractOne(name, self._team_index, scorer=fuzz.WRatio)
-        return match[0] if match else None
+        cached = self._cache_get(index.match_cache, name)
+        if cached is not _MISSING:
+            return cached
+        result = self._match_team_uncached(index, name)
+        self._cache_put(index.match_cache, name, result)
+        return result
+
+    @staticmethod
+    def _match_team_uncached(index: _MarketIndex, name: str) -> str | None:
+        key = utils.default_process(name)
+        exact = index.exact.get(key)
+        if exact is not None:
+            return exact
+        if len(key) < _WRATIO_MAX_QUERY_LEN:
+            scorer, cutoff = fuzz.WRatio, _MATCH_SCORE_CUTOFF
+        else:
+            scorer, cutoff = fuzz.token_set_ratio, _TOKEN_SET_SCORE_CUTOFF
+        match = process.extractOne(
+            key,
+            index.teams_norm,
+            scorer=scorer,
+            processor=None,
+            score_cutoff=cutoff,
+        )
+        return index.teams[match[2]] if match else None
 
     def find_market(self, team_name: str) -> MarketEntry | None:
         """Return a market entry for a matching team name."""
-        match = self.match_team(team_name)
-        if not match:
-            return None
-        for entry in self._entries:
-            if match in entry.teams:
-                return entry
-        return None
+        index = self._index
+        cached = self._cache_get(index.market_cache, team_name)
+        if cached is not _MISSING:
+            return cached
+        match = self._match_team(index, team_name)
+        result = index.team_to_entry.get(match) if match else None
+        self._cache_put(index.market_cache, team_name, result)
+        return result
+
+    def find_markets_bulk(
+        self, team_names: Sequence[str]
+    ) -> list[MarketEntry | None]:
+        """Resolve many team names at once, scoring cache misses with ``cdist``."""
+        index = self._index
+        results: list[Any] = [
+            self._cache_get(index.market_cache, name) for name in team_names
+        ]
+        short: list[tuple[int, str]] = []
+        long: list[tuple[int, str]] = []
+        for i, name in enumerate(team_names):
+            if results[i] is not _MISSING:
+                continue
+            key = utils.default_process(name)
+            exact = index.exact.get(key)
+            if exact is not None:
+                results[i] = index.team_to_entry.get(exact)
+            elif not index.teams:
+                results[i] = None
+            elif len(key) < _WRATIO_MAX_QUERY_LEN:
+                short.append((i, key))
+            else:
+                long.append((i, key))
+
+        for pending, scorer, cutoff in (
+            (short, fuzz.WRatio, _MATCH_SCORE_CUTOFF),
+            (long, fuzz.token_set_ratio, _TOKEN_SET_SCORE_CUTOFF),
+        ):
+            if not pending:
+                continue
+            scores = process.cdist(
+                [key for _, key in pending],
+                index.teams_norm,
+                scorer=scorer,
+                processor=None,
+                score_cutoff=cutoff,
+                dtype=np.float64,
+                workers=-1 if len(pending) >= _CDIST_PARALLEL_MIN else 1,
+            )
+            # argmax keeps the first best choice, matching extractOne's tie-break;
+            # scores below the cutoff come back as 0.
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(pending)), best]
+            for (i, _), col, score in zip(pending, best, best_scores):
+                team = index.teams[col] if score else None
+                results[i] = index.team_to_entry.get(team) if team else None
+
+        for name, result in zip(team_names, results):
+            self._cache_put(index.market_cache, name, result)
+        return results
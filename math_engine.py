@@ -1,6 +1,8 @@
 """Probability and sizing math for the sniper bot."""
 from __future__ import annotations
 
+import numpy as np
+
 
 def american_to_implied_prob(odds: int) -> float:
     if odds > 0:
@@ -10,21 +12,42 @@ def american_to_implied_prob(odds: int) -> float:
 
 def devig_two_way(odds_a: int, odds_b: int) -> tuple[float, float]:
     """Remove vig from a two-outcome market using proportional normalization."""
-    p_a = american_to_implied_prob(odds_a)
-    p_b = american_to_implied_prob(odds_b)
+    # american_to_implied_prob inlined; for odds <= 0, abs(odds) == -odds.
+    p_a = 100 / (odds_a + 100) if odds_a > 0 else -odds_a / (100 - odds_a)
+    p_b = 100 / (odds_b + 100) if odds_b > 0 else -odds_b / (100 - odds_b)
     total = p_a + p_b
     if total == 0:
         return 0.0, 0.0
     return p_a / total, p_b / total
 
 
+def american_to_implied_prob_arr(odds: np.ndarray) -> np.ndarray:
+    """Vectorized ``american_to_implied_prob`` over an array of American odds."""
+    odds = np.asarray(odds, dtype=np.float64)
+    magnitude = np.abs(odds)
+    return np.where(odds > 0, 100.0, magnitude) / (magnitude + 100)
+
+
+def devig_two_way_arr(
+    odds_a: np.ndarray, odds_b: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``devig_two_way``; rows with zero total implied prob yield 0."""
+    p_a = american_to_implied_prob_arr(odds_a)
+    p_b = american_to_implied_prob_arr(odds_b)
+    total = p_a + p_b
+    zero = total == 0
+    total = np.where(zero, 1.0, total)
+    return np.where(zero, 0.0, p_a / total), np.where(zero, 0.0, p_b / total)
+
+
 def kelly_fraction(edge: float, payout: float) -> float:
     """Return Kelly fraction based on edge and payout ratio (b)."""
-    if payout <= 0:
+    if edge <= 0 or payout <= 0:
         return 0.0
-    return max(0.0, edge / payout)
+    return edge / payout
 
 
 def kelly_bet_size(bankroll: float, edge: float, payout: float, multiplier: float) -> float:
-    fraction = kelly_fraction(edge, payout)
-    return max(0.0, bankroll * fraction * multiplier)
+    if edge <= 0 or payout <= 0 or bankroll <= 0 or multiplier <= 0:
+        return 0.0
+    return bankroll * (edge / payout) * multiplier